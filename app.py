@@ -1,10 +1,48 @@
 import streamlit as st  # python framework used for building interactive web applications for Data Science and Machine Learning
 import requests  # for making HTTP requests
+import orjson  # for fast JSON decoding of API responses
 import pandas as pd  # for data manipulation
+import numpy as np  # for building typed column arrays
 import plotly.express as px  # for data visualization
 from datetime import datetime, timedelta  # for data operations
 import sys  # to handle system-specific parameters and functions
 import io  # to handle I/O operations
+import time  # for rate limiting between API calls
+import threading  # to guard the rate limiter shared by worker threads
+import importlib.util  # to probe for optional packages without importing them
+from concurrent.futures import ThreadPoolExecutor  # to run independent API calls concurrently
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx  # to let worker threads call Streamlit elements
+from requests.adapters import HTTPAdapter  # to mount retry behaviour on the session
+from urllib3.util.retry import Retry  # for exponential backoff retries
+
+# check whether statsmodels (needed for trendlines) is installed without importing it; plotly imports it lazily for trendline='ols'
+# (a present-but-broken install is caught as ImportError when the trendline is built)
+_HAS_SM = importlib.util.find_spec('statsmodels') is not None
+
+# HTTP settings for the JPL API
+USER_AGENT = 'neo-comet-tracker/1.0 python-requests'   # descriptive User-Agent so JPL can identify our traffic
+REQUEST_TIMEOUT = (3.05, 15)   # (connect, read) seconds before an API call attempt is abandoned
+# With the retry policy in get_session() (at most 4 retries: 1 after a read timeout, 2 after an error status)
+# at most 4 attempts can each use the full connect + read timeout and 1 more can fail on connect, so a fetch
+# gives up after at most 4 x (3.05 + 15) + 3.05 + 7 s of backoff, i.e. about 82 s, plus up to RATE_LIMIT_MAX_WAIT of pacing
+
+# Request pacing for the JPL API (token bucket: sustained rate and burst size)
+RATE_LIMIT_PER_SEC = 2.0
+RATE_LIMIT_BURST = 4
+RATE_LIMIT_BACKOFF = 1.0   # seconds to pause when the API reports no remaining quota without a Retry-After
+RATE_LIMIT_MAX_WAIT = 10.0   # longest server-requested pause we honour; longer requests fail the fetch instead
+
+# Above this many points the scatter is drawn with WebGL instead of SVG
+WEBGL_THRESHOLD = 500
+
+# API filter parameter for each object type
+OBJECT_TYPE_PARAMS = {'NEO': 'neo', 'Comet': 'comet'}
+
+# Month abbreviations used by the CAD API dates (e.g. '2024-Jan-05 13:22') mapped to ISO month numbers
+MONTHS = {
+    'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04', 'May': '05', 'Jun': '06',
+    'Jul': '07', 'Aug': '08', 'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'
+}
 
 # Mapping of display names to API body codes
 # Define a dictionary mapping celestial bodies to their API codes
@@ -19,10 +57,95 @@ BODY_CODES = {
     'Neptune': 'Neptn',
     'Moon': 'Moon'
 }
+BODY_DISPLAY_OPTIONS = tuple(BODY_CODES)   # display names offered in the body select box
 
-# Function to fetch close approach data
-# Define function with default parameters
-def fetch_close_approaches(body_code='Earth', min_date='now', max_date='+60', max_dist='0.05', dist_unit='AU', my_limit=100, object_type='NEO'):
+# Column headers for the data table; the distance header is added per call since it depends on the unit
+_BASE_RENAME = {
+    'des': '🪐 Designation',   # rename 'des' to 'Designation'
+    'cd': '📅 Date',  # rename 'cd' to 'Date'
+    'v_rel': '⚡ Relative Velocity (km/s)',   # rename 'v_rel' to 'Relative Velocity'
+    'v_inf': '♾️ Infinity Velocity (km/s)'   # rename 'v_inf' to 'Infinity Velocity'
+}
+
+# Axis labels for the plot; the distance label is added per call since it depends on the unit
+_BASE_LABELS = {
+    'cd': 'Date'
+}
+
+# Hover text for the scatter points, set once per trace (customdata holds des, v_rel, v_inf)
+_HOVERTEMPLATE = (
+    '🪐 %{customdata[0]}<br>'
+    '📅 %{x}<br>'
+    '📏 %{y:.6g}<br>'
+    '⚡ %{customdata[1]:.4g} km/s<br>'
+    '∞ %{customdata[2]:.4g} km/s'
+    '<extra></extra>'
+)
+
+# Shared HTTP session so repeated calls reuse one keep-alive connection to the JPL API
+@st.cache_resource
+def get_session():
+    session = requests.Session()   # session survives reruns thanks to cache_resource
+    retries = Retry(    # retry transient failures with exponential backoff
+        total=4,
+        read=1,    # retry a read timeout only once, each one can cost the full read timeout
+        status=2,    # retry 429/5xx responses at most twice, each slow response can also cost the full read timeout
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False,    # hand the final response to raise_for_status() so HTTP error details are still shown
+        respect_retry_after_header=False    # never sleep for an unbounded Retry-After; _note_rate_limit_headers clamps it instead
+    )
+    session.mount('https://', HTTPAdapter(max_retries=retries))   # apply retries to all HTTPS requests
+    session.headers.update({'User-Agent': USER_AGENT})   # identify the app to the API
+    return session
+
+# Token bucket state shared across reruns and sessions
+@st.cache_resource
+def _get_rate_limiter():
+    return {
+        'lock': threading.Lock(),
+        'tokens': float(RATE_LIMIT_BURST),   # start with a full bucket
+        'updated': time.monotonic(),    # last time tokens were refilled
+        'not_before': 0.0   # earliest time the API asked us to call again
+    }
+
+# Block until the token bucket allows another API call
+def _throttle():
+    limiter = _get_rate_limiter()
+    with limiter['lock']:
+        now = time.monotonic()
+        # refill tokens for the elapsed time, capped at the burst size
+        limiter['tokens'] = min(RATE_LIMIT_BURST, limiter['tokens'] + (now - limiter['updated']) * RATE_LIMIT_PER_SEC)
+        limiter['updated'] = now
+        limiter['tokens'] -= 1   # reserve a token (may go negative, meaning we have to wait)
+        wait = max(-limiter['tokens'] / RATE_LIMIT_PER_SEC, limiter['not_before'] - now, 0.0)
+    if wait > 0:
+        time.sleep(wait)   # sleep outside the lock so other threads can reserve their slot
+
+# Honour Retry-After / X-RateLimit-* headers before the next call (clamped to RATE_LIMIT_MAX_WAIT)
+def _note_rate_limit_headers(response):
+    headers = response.headers
+    delay = 0.0
+    retry_after = headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            delay = float(retry_after)   # Retry-After given in seconds
+        except ValueError:
+            delay = RATE_LIMIT_BACKOFF   # HTTP-date form, fall back to a fixed pause
+    elif headers.get('X-RateLimit-Remaining') == '0':
+        delay = RATE_LIMIT_BACKOFF   # quota exhausted, pause before the next call
+    if delay > 0:
+        limiter = _get_rate_limiter()
+        with limiter['lock']:
+            limiter['not_before'] = max(limiter['not_before'], time.monotonic() + min(delay, RATE_LIMIT_MAX_WAIT))   # never block later calls for longer than the cap
+    if delay > RATE_LIMIT_MAX_WAIT:   # server wants a longer pause than we are willing to block for
+        raise requests.exceptions.RequestException(f"API asked to wait {delay:.0f} s before retrying; please try again later.", response=response)
+
+# Function to fetch the raw close approach payload (cached)
+# Only successful responses are cached; exceptions propagate to the caller so errors are never memoized
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_raw(body_code, min_date, max_date, max_dist, dist_unit, my_limit, object_type):
     url = 'https://ssd-api.jpl.nasa.gov/cad.api'  # define the API URL
     my_params = {     # create a dictionary of parameters for API request
         'body':body_code,
@@ -33,21 +156,29 @@ def fetch_close_approaches(body_code='Earth', min_date='now', max_date='+60', ma
     }
     
     # Filter by object type if selected
-    if object_type == 'NEO':   # check if object type is Near-Earth Object
-        my_params['neo'] = 'true'    # add 'neo' parameter to API request
-    elif object_tye == 'Comet':   # check if object type is comet
-        my_params['comet'] = 'true'   # Add 'comet' parameter to API request
+    if object_type in OBJECT_TYPE_PARAMS:   # check if object type is 'NEO' or 'Comet'
+        my_params[OBJECT_TYPE_PARAMS[object_type]] = 'true'    # add 'neo' or 'comet' parameter so the server filters
         
+    _throttle()   # respect the client-side rate limit
+    response = get_session().get(url, params=my_params, timeout=REQUEST_TIMEOUT)  # make GET request to API over the shared session
+    _note_rate_limit_headers(response)   # pick up any server-side rate limit hints
+    response.raise_for_status()  # raise HTTPError for bad responses
+    try:
+        return orjson.loads(response.content)  # parse JSON response with orjson and return it
+    except orjson.JSONDecodeError as err:   # non-JSON body (e.g. an HTML maintenance page)
+        raise requests.exceptions.InvalidJSONError(f"Invalid JSON in API response: {err}", response=response) from err   # surface as a RequestException like response.json() did
+
+# Function to fetch close approach data
+# Define function with default parameters
+def fetch_close_approaches(body_code='Earth', min_date='now', max_date='+60', max_dist='0.05', dist_unit='AU', my_limit=100, object_type='NEO'):
     # Start try block to handle potential exceptions
     try: 
-        response = requests.get(url, params=my_params)  # make GET request to API
-        response.raise_for_status()  # raise HTTPError for bad responses
-        data = response.json()  # parse JSON response
+        data = _fetch_raw(body_code, min_date, max_date, max_dist, dist_unit, my_limit, object_type)  # fetch (or reuse cached) API data
         return data  # return the fetched data
     except requests.exceptions.HTTPError as http_err:   # Handle HTTP errors
         st.error(f"⚠️ HTTP error occurred: {http_err}")    # Display HTTP Error message in Streamlit
         try:  # Start nested try block to parse error details
-            error_info = response.json()   # attempt to parse error details from response
+            error_info = http_err.response.json()   # attempt to parse error details from response
             st.error(f"🔍 Error Details: {error_info}")    # display error details in Streamlit
         except ValueError:   # Handle cases where response is not JSON
             st.error(f"🔍 No additional error information provided.")   # inform user no extra error info is available
@@ -56,7 +187,16 @@ def fetch_close_approaches(body_code='Earth', min_date='now', max_date='+60', ma
         st.error(f"⚠️ Error fetching data from API: {e}")      # display general error message in Streamlit
         return None
     
+# convert a raw API value to float, coercing missing or malformed values to NaN
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
 # function to parse the data
+# cached so DataFrame construction and date parsing don't re-run for an identical payload
+@st.cache_data(show_spinner=False)
 def parse_data(data):   # Define function to parse API data
     if data is None or data.get('count', 0) == 0:  # check if data is empty or count is zero
         st.warning("⚠️ No close approached found for the given parameters.")
@@ -64,52 +204,80 @@ def parse_data(data):   # Define function to parse API data
     
     fields = data.get('fields', [])   # get field names from data
     records = data.get('data', [])    # get records from data
-    fd = pd.DataFrame(records, columns=fields)   # create DataFrame from records and fields
+    n = len(records)   # number of rows returned
+    cols = dict(zip(fields, zip(*records)))   # transpose row-major records into column-major tuples keyed by field
     
-    # convert relevant columns to appropriate data types
-    fd['cd'] = pd.to_datetime(fd['cd'], format='%Y-%b-%d %H:%M')   # convert 'cd' columns to datetime
-    fd['dist'] = pd.to_numeric(fd['dist'], errors='coerce')   # convert 'dist' columnt to numeric, coercing errors
-    fd['v_rel'] = pd.to_numeric(fd['v_rel'], errors='coerce')   # convert  'v_rel' column to numeric, coercing errors
-    fd['v_inf'] = pd.to_numeric(fd['v_inf'], errors='coerce')   # convert 'v_inf' column to numeric, coercing errors
+    # build the relevant columns directly with their final dtypes
+    iso_dates = [f"{cd[:4]}-{MONTHS[cd[5:8]]}{cd[8:11]}T{cd[12:]}" for cd in cols['cd']]   # rewrite 'YYYY-Mon-DD HH:MM' as ISO 'YYYY-MM-DDTHH:MM'
+    cols['cd'] = np.asarray(iso_dates, dtype='datetime64[ns]')   # parse ISO dates straight into a datetime column
+    for col in ('dist', 'v_rel', 'v_inf'):
+        cols[col] = np.fromiter((_to_float(v) for v in cols[col]), dtype=np.float64, count=n)   # numeric column, blanks become NaN
+    fd = pd.DataFrame(cols, columns=fields)   # create DataFrame from typed columns, keeping the API field order
+    fd['des'] = fd['des'].astype('category')   # designations as categorical codes + dictionary
     
     return fd    # return the parsed DataFrame
 
-# Function to visualize the data using Plotly with trendline(optional)          
-def visualize_close_approaches(fd, body, add_trendline=False):   # Define visualization fucntion with optional trendline
-    if fd.empty:    # check if DataFrame is empty
-        return    # exit function if no data is available
-    
-    # check if trendline is requested and statsmodels is installed
-    if add_trendline:
-        try:
-            import statsmodels.api as statsmodels
-        except ImportError:
-            st.warning("⚠️ Statsmodels is not installed. Trendline feature is disabled")
-            add_trendline = False    # disable trendline feature
-    
-    if add_trendline:   # check again if trendline is to added after import
+# cheap fingerprint of a parsed DataFrame used as its cache key (avoids hashing every row)
+def _frame_fingerprint(fd):
+    return (len(fd), fd['cd'].iloc[0].value, fd['cd'].iloc[-1].value, float(fd['dist'].sum()))
+
+# Function to build the Plotly figure (cached so widget-only reruns skip figure construction)
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _frame_fingerprint})
+def _build_fig(fd, body, add_trendline, dist_unit):
+    if add_trendline:   # check if trendline is to be added
         my_trendline = "ols"    # set trendline type to Ordinary Least Squares
     else:    # if trendline is not to be added
         my_trendline = None   # no trendline
+    
+    render_mode = 'webgl' if len(fd) > WEBGL_THRESHOLD else 'svg'   # single GL canvas for large result sets
+         
+    # float32 copy of the y column only: it is serialized as a typed array, so this halves its payload (table and CSV keep float64)
+    plot_fd = fd[['cd', 'dist']].astype({'dist': np.float32})
          
     fig = px.scatter(    # create a scatter plot using Plotly Express
-        fd,    # DataFrame to plot
+        plot_fd,    # DataFrame to plot
         x='cd',   # set x-axis to 'cd' column
         y='dist',
-        hover_data=['des', 'v_rel', 'v_inf'],
-        labels={
-            'cd': '📅 Date',
-            'dist': f'📏 Distance ({st.session_state.get("dist_unit", "AU")})',   # label for 'dist' axis with unit
-            'des': '🪐 Designation',     # label for 'des' hover data
-            'v_rel': '⚡ Relative Velocity (km/s)',      # label for 'v_rel' hover data
-            'v_inf': '∞ Infinity Velocity (km/s)'   # label for 'v_inf' hover data          
-        },
+        labels={**_BASE_LABELS, 'dist': f'Distance ({dist_unit})'},   # shared labels plus 'dist' axis label with unit
         title = f'🔭 Close Approached to {body}',    # set the title of the plot
-        trendline = my_trendline      # add trendline if specified
+        trendline = my_trendline,      # add trendline if specified
+        render_mode = render_mode    # 'webgl' or 'svg'
     )        
     
+    fig.update_traces(    # one hover template per trace instead of per-point hover labels
+        hovertemplate = _HOVERTEMPLATE,
+        customdata = fd[['des', 'v_rel', 'v_inf']].to_numpy(),    # mixed-type object array, so float64 (float32 would only widen on serialization)
+        selector = dict(mode = 'markers')    # leave the trendline trace untouched
+    )
     fig.update_yaxes(autorange="reversed")    # invert the y-axis for better visualization
+    return fig
+
+# Function to encode the DataFrame as CSV bytes for download (cached so reruns skip re-encoding)
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: _frame_fingerprint})
+def _csv_bytes(fd):
+    return fd.to_csv(index = False).encode('utf-8')   # convert DataFrame to CSV and encode
+
+# Function to visualize the data using Plotly with trendline(optional)          
+def visualize_close_approaches(fd, body, add_trendline=False, dist_unit='AU'):   # Define visualization fucntion with optional trendline
+    if fd.empty:    # check if DataFrame is empty
+        return    # exit function if no data is available
+    
+    # check if trendline is requested and statsmodels is installed
+    if add_trendline and not _HAS_SM:
+        st.warning("⚠️ Statsmodels is not installed. Trendline feature is disabled")
+        add_trendline = False    # disable trendline feature
+    
+    try:
+        fig = _build_fig(fd, body, add_trendline, dist_unit)   # build (or reuse cached) figure
+    except ImportError:   # statsmodels is present but broken (e.g. scipy or patsy missing)
+        st.warning("⚠️ Statsmodels is not installed. Trendline feature is disabled")
+        fig = _build_fig(fd, body, False, dist_unit)   # fall back to a plot without trendline
     st.plotly_chart(fig, use_container_width = True)    # display the plotly chart in Streamlit
+    if len(fd) > WEBGL_THRESHOLD:   # explain the rendering trade-off for large result sets
+        st.caption(
+            "ℹ️ Rendered with WebGL for speed.",
+            help = f"Charts with more than {WEBGL_THRESHOLD} points are drawn on a single WebGL canvas, which pans and zooms smoothly but does not support per-point SVG styling."
+        )
     
     
 # Streamlit App
@@ -125,11 +293,11 @@ def main():
     st.sidebar.header("Input Parameters")   # add header to the sidebar
     
     # Celestial Body Selection
-    body_display_options = list(BODY_CODES.keys())    # get the list of celestial body display options
     body_display = st.sidebar.selectbox(        # create a select box for choosing from the listed celestial bodies
             "🪐 Select Celestial Body",    # label for the select box
-            body_display_options,     # options for selection(taken as keys from display_options)
+            BODY_DISPLAY_OPTIONS,     # options for selection (keys of BODY_CODES)
             index = 2,     # default selection index = 2 (Earth)
+            key = 'body_display',    # Streamlit persists the selection in st.session_state['body_display']
             help="Choose the celestial body you want to analyze close approaches to."    # Help tooltip                    
     )
     body_code = BODY_CODES[body_display]    # get the API code for the selected body
@@ -163,16 +331,16 @@ def main():
             step = 1,   # step size of input
             help = "Specify the number of days from the start date to set the end date."    # help tooltip
         )
-        max_date = (datetime.combine(min_date, datetime.min.time()) + timedelta(days=days_from_start)).strftime('%Y-%m-%d')   # calculate end date based on days from start
+        max_date = (min_date + timedelta(days=days_from_start)).isoformat()   # calculate end date based on days from start
     elif max_date_option == 'Specific Date':     # check if end date is a specific date
         specific_max_date = st.sidebar.date_input(     # create date input for specific end date
             "📅 End Date",     # label for end date
             value=default_end_date,    # default end date (60 days from today)
             min_value=min_date,    # min selectable date
-            max_value=datetime(2100, 12, 41),    # max selectable date
+            max_value=datetime(2100, 12, 31),    # max selectable date
             help="Select a specific end date for the close approaches data."    # help tooltip
         )
-        max_date = specific_max_date.strftime('%Y-%m-%d')   # format end date as string
+        max_date = specific_max_date.isoformat()   # format end date as string
         
     # distance unit selection (AU or LD)
     st.sidebar.subheader("Distance Parameters")    # add subheader
@@ -195,7 +363,7 @@ def main():
         "☄️ Object Type",      # label for object type selection
         options = ['NEO', 'Comet', 'Both'],   # options: Near-Earth Objects, Comets, or Both
         index = 0,    # default value = 'NEO'
-        help = "Filter results by object type: Near-Earth Objects(NEO), Comets, or Both."     # help tooltip 
+        help = "Filter results by object type: Near-Earth Objects(NEO), Comets, or Both. 'Both' fetches NEOs and comets separately (up to the result limit each) and combines them."     # help tooltip 
     )   
         
     # Number of results
@@ -213,75 +381,63 @@ def main():
         
     if fetch_data:      # check if the fetch button was clicked
         with st.spinner("⏳ Fetching data...."):    # show a spinner while fetching data
-            if object_type in ['NEO', 'Comet']:   # check if object type is 'NEO' or 'Comet'
-                # single API call
-                data = fetch_close_approaches(     # fetch close approach data using API
+            # the CAD API's 'neo' filter defaults to true, so an unfiltered request would be NEO-only;
+            # 'Both' therefore issues one server-filtered request per object type and combines the results
+            kinds = ('NEO', 'Comet') if object_type == 'Both' else (object_type,)
+            kwargs_list = [
+                dict(
                     body_code = body_code,    # pass celestial body code
-                    min_date = min_date.strftime('%Y-%m-%d'),      # pass formatted start date
+                    min_date = min_date.isoformat(),      # pass formatted start date
                     max_date = max_date,     # pass end date
                     max_dist = max_dist,      # pass maximum distance 
                     dist_unit = dist_unit,     # pass distance unit
                     my_limit = limit,     # pass result limit 
-                    object_type = object_type     # specify object type as 'NEO'
+                    object_type = kind     # specify object type ('NEO' or 'Comet')
                 )
-                fd = parse_data(data)  # parse the fetched data into DataFrame
-            elif object_type == 'Both':     # check if object type is 'Both'
-                # two separate API calls and combine
-                data_neo = fetch_close_approaches(
-                    body_code = body_code,     # pass celestial body code
-                    min_date = min_date.strftime('%Y-%m-%d'),     # pass formatted start date
-                    max_date = max_date,     # pass end date
-                    max_dist = max_dist,      # pass maximum distance
-                    dist_unit = dist_unit,     # pass distance unit
-                    my_limit = limit,     # pass result limit
-                    object_type = 'NEO'     # specify the object type as 'NEO'
-                )
-                data_comet = fetch_close_approaches(    # fetch comet data using API  
-                    body_code = body_code,    # pass celestial body code
-                    min_date = min_date.strftime('%Y-%m-%d'),   # pass formatted start date
-                    max_date = max_date,    # pass end date
-                    max_dist = max_dist,     # pass maximum distance
-                    dist_unit = dist_unit,     # pass distance unit
-                    my_limit = limit,    # pass result limit
-                    object_type = 'Comet'    # specify object type as 'Comet'    
-                )
-                fd_neo = parse_data(data_neo)    # parse NEO data into DataFrame
-                fd_comet = parse_data(data_comet)   # parse Comet data into DataFrame
-                    
-                # combine dataframes
-                fd = pd.concat([fd_neo, fd_comet], ignore_index = True)    # concatenate NEO and Comet DataFrames
-                fd.drop_duplicates(inplace = True)   # remove duplicated records
+                for kind in kinds
+            ]
+            # attach the script run context to the workers so st.error() inside the fetch still renders
+            ctx = get_script_run_ctx()
+            with ThreadPoolExecutor(max_workers = 2, initializer = add_script_run_ctx, initargs = (None, ctx)) as ex:
+                results = list(ex.map(lambda kw: fetch_close_approaches(**kw), kwargs_list))   # fetch each kind in parallel (cached per parameter set)
+            frames = [parse_data(data) for data in results]  # parse the fetched data into DataFrames
+            frames = [frame for frame in frames if not frame.empty]   # skip kinds with no results
+            if len(frames) > 1:   # combine NEO and comet results
+                fd = pd.concat(frames, ignore_index = True)    # concatenate NEO and Comet DataFrames
+                fd = fd.drop_duplicates(subset = ['des', 'cd'], keep = 'first')   # NEO comets appear in both results, keyed on designation + approach date
+                fd['des'] = fd['des'].astype('category')   # concat of differing categories falls back to object, restore categorical
+            elif frames:
+                fd = frames[0]
+            else:
+                fd = pd.DataFrame()   # no results for any kind
                     
         if not fd.empty:   # check if DataFrame is not empty
             st.success(f"✅ Found {len(fd)} close approaches to **{body_display}**.")    # display success message with count
                 
             # Store DataFrame in Session State
             st.session_state['fd'] = fd  # save DataFrame to session state
-            st.session_state['body_display'] = body_display  # save selected body display name to session state
+            rename = {**_BASE_RENAME, 'dist': f'📏 Distance ({dist_unit})'}   # shared headers plus 'dist' with unit
+            st.session_state['fd_display'] = fd[['des', 'cd', 'dist', 'v_rel', 'v_inf']].rename(columns=rename)    # precompute the displayed view with renamed columns
+            st.session_state['fd_body'] = body_display  # save the body the data was fetched for
             st.session_state['dist_unit'] = dist_unit   # save distance unit to session state
         else:   # if DataFrame is empty
             st.session_state['fd'] = pd.DataFrame()   # save empty DataFrame to session state
-            st.session_state['body_display'] = body_display
+            st.session_state['fd_display'] = pd.DataFrame()
+            st.session_state['fd_body'] = body_display
             st.session_state['dist_unit'] = dist_unit
                 
     # check if data is available in session state
     if 'fd' in st.session_state and not st.session_state['fd'].empty:  # check for data in session state
         fd = st.session_state['fd']   # retrieve DataFrame from session state
-        body_display = st.session_state['body_display']   # retrieve selected body display name 
+        body_display = st.session_state['fd_body']   # retrieve the body the data was fetched for
         dist_unit = st.session_state['dist_unit']     # retrieve distance unit
             
         # display the data table
         st.subheader("📊 Close Approach Data")   # add subheader for data table
-        st.dataframe(fd[['des', 'cd', 'dist', 'v_rel', 'v_inf']].rename(columns={    # display DataFrame with renamed columns
-            'des': '🪐 Designation',   # rename 'des' to 'Designation'
-            'cd': '📅 Date',  # rename 'cd' to 'Date'
-            'dist': f'📏 Distance ({dist_unit})',   # rename 'dist' to 'Distance' with unit
-            'v_rel': '⚡ Relative Velocity (km/s)',   # rename 'v_rel' to 'Relative Velocity'
-            'v_inf': '♾️ Infinity Velocity (km/s)'   # rename 'v_inf' to 'Infinity Velocity'
-        }))   # end of rename dictionary 
+        st.dataframe(st.session_state['fd_display'])   # display the precomputed view with renamed columns
             
         # download button for CSV
-        csv = fd.to_csv(index = False).encode('utf-8')   # convert DataFrame to CSV and encode
+        csv = _csv_bytes(fd)   # CSV bytes (cached per DataFrame)
         st.download_button(    # create a download button for CSV
             label = "📥 Download Data as CSV",   # label for download button
             data = csv,  # data to download
@@ -292,10 +448,10 @@ def main():
         # trendline toggle in main area
         st.markdown("---")   # add a horizontal separator
         st.subheader("📈 Visualization")   # add subheader for visualization
-        add_trendline = st.checkbox("✨ Add Trendline (Requires statsmodels)")    # Create a checkbox to add trendline
+        add_trendline = st.checkbox("✨ Add Trendline (Requires statsmodels)", disabled = not _HAS_SM)    # Create a checkbox to add trendline, disabled without statsmodels
             
         # visualization
-        visualize_close_approaches(fd, body_display, add_trendline = add_trendline)   # call visualization function
+        visualize_close_approaches(fd, body_display, add_trendline = add_trendline, dist_unit = dist_unit)   # call visualization function
             
     else:   # if no data is available in session state
         if fetch_data:   # check if fetch button was clicked